@@ -0,0 +1,186 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import zipfile
+
+from DjangoAdCrawler.executors import get_executor
+from DjangoAdCrawler.utils import (
+    ImageFetchResult, ImageRedirectResolver, split_image_urls
+)
+
+logger = logging.getLogger('import_logger')
+
+MANIFEST_NAME = 'manifest.json'
+IMAGES_DIR = 'images'
+MANIFEST_VERSION = 1
+
+
+def _image_file_name(url):
+    return f"{IMAGES_DIR}/{hashlib.sha1(url.encode('utf-8')).hexdigest()}.jpg"
+
+
+def load_manifest(bundle_dir):
+    path = os.path.join(bundle_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {'version': MANIFEST_VERSION, 'last_row': 0, 'images': {}}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(bundle_dir, manifest):
+    """
+    Записывает манифест атомарно, чтобы прерванная загрузка
+    не оставила повреждённый файл.
+    """
+    path = os.path.join(bundle_dir, MANIFEST_NAME)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def download_image_bundle(
+    rows, columns, images_column, bundle_dir, start_row=None, executor=None,
+    archive=False
+):
+    """
+    Первая фаза офлайн-импорта: скачивает все изображения из CSV
+    в каталог bundle_dir с манифестом (ссылка -> файл). Уже скачанные
+    и отклонённые ссылки пропускаются, поэтому загрузку можно прервать
+    и продолжить в любой момент. На 429 ждёт паузу регулятора и
+    повторяет строку.
+    :param images_column: название столбца со ссылками на изображения
+    :param start_row: с какой строки начинать; по умолчанию — со строки
+        после last_row из манифеста, а если CSV уже пройден до конца
+        (или пакет новый) — с 1, чтобы докачать ссылки, которых нет
+        в манифесте (сетевые ошибки, 4xx)
+    :param archive: упаковать каталог в bundle_dir.zip по завершении
+    :return: dict с количеством скачанных, отклонённых и путём к пакету
+    """
+    os.makedirs(os.path.join(bundle_dir, IMAGES_DIR), exist_ok=True)
+    manifest = load_manifest(bundle_dir)
+    images = manifest['images']
+    if start_row is None:
+        start_row = manifest.get('last_row', 0) + 1
+        if start_row >= len(rows):
+            start_row = 1
+    resolver = ImageRedirectResolver()
+    executor = executor or get_executor('thread')
+    downloaded = 0
+    rejected = 0
+    i = start_row
+    while i < len(rows):
+        data = dict(zip(columns, rows[i]))
+        img_urls = [
+            url for url in split_image_urls(data.get(images_column))
+            if url not in images
+        ]
+        fetched_images = resolver.fetch_many(img_urls, executor=executor) if img_urls else []
+        throttled = False
+        for img_url, fetched in zip(img_urls, fetched_images):
+            if fetched.status_code == 429:
+                throttled = True
+                continue
+            if fetched.content:
+                file_name = _image_file_name(img_url)
+                with open(os.path.join(bundle_dir, file_name), 'wb') as f:
+                    f.write(fetched.content)
+                images[img_url] = {
+                    'file': file_name,
+                    'final_url': fetched.final_url,
+                    'size': len(fetched.content),
+                }
+                downloaded += 1
+            elif fetched.status_code == 200:
+                # Окончательный отказ: не тот хост или не изображение.
+                # 4xx (блокировка ботов и т.п.) не записываем — повторим позже
+                images[img_url] = {
+                    'file': None,
+                    'final_url': fetched.final_url,
+                    'status': fetched.status_code,
+                }
+                rejected += 1
+        resolver.throttle.persist()
+        if throttled:
+            save_manifest(bundle_dir, manifest)
+            pause_minutes = resolver.throttle.pause_minutes()
+            logger.warning(f'Bundle download paused {pause_minutes} min at row {i} due to 429')
+            time.sleep(pause_minutes * 60)
+            continue
+        manifest['last_row'] = i
+        save_manifest(bundle_dir, manifest)
+        i += 1
+    logger.info(
+        f'Image bundle {bundle_dir}: downloaded={downloaded}, rejected={rejected}, '
+        f'total={len(images)}'
+    )
+    path = bundle_dir
+    if archive:
+        path = shutil.make_archive(bundle_dir.rstrip(os.sep), 'zip', bundle_dir)
+    return {
+        'downloaded': downloaded,
+        'rejected': rejected,
+        'total': len(images),
+        'path': path,
+    }
+
+
+class _NullThrottle:
+    """
+    Заглушка регулятора для чтения с диска: пауз и лимитов нет.
+    """
+    def persist(self):
+        pass
+
+    def pause_minutes(self):
+        return 0
+
+    def bottleneck(self):
+        return None
+
+
+class ImageBundle:
+    """
+    Вторая фаза офлайн-импорта: источник изображений из пакета
+    (каталог или .zip с манифестом) вместо сети. Подставляется
+    в ImportEngine на место ImageRedirectResolver. Ссылки, которых
+    нет в пакете, собираются в missing.
+    """
+    throttle = _NullThrottle()
+
+    def __init__(self, path):
+        self.path = path
+        self._zip = None
+        self.missing = set()
+        if zipfile.is_zipfile(path):
+            self._zip = zipfile.ZipFile(path)
+            if MANIFEST_NAME not in self._zip.namelist():
+                raise FileNotFoundError(f'{MANIFEST_NAME} not found in {path}')
+            manifest = json.loads(self._zip.read(MANIFEST_NAME).decode('utf-8'))
+        elif os.path.isfile(os.path.join(path, MANIFEST_NAME)):
+            manifest = load_manifest(path)
+        else:
+            raise FileNotFoundError(f'Image bundle {path} not found or has no {MANIFEST_NAME}')
+        self.images = manifest['images']
+
+    def _read(self, file_name):
+        if self._zip is not None:
+            return self._zip.read(file_name)
+        with open(os.path.join(self.path, file_name), 'rb') as f:
+            return f.read()
+
+    def fetch(self, url):
+        entry = self.images.get(url)
+        if entry is None:
+            logger.warning(f'Image {url} is missing in bundle {self.path}')
+            self.missing.add(url)
+            return ImageFetchResult(0, None, None, False)
+        if not entry['file']:
+            return ImageFetchResult(entry.get('status', 0), None, None, False)
+        return ImageFetchResult(200, entry['final_url'], self._read(entry['file']), True)
+
+    def fetch_many(self, urls, executor=None):
+        return [self.fetch(url) for url in urls]
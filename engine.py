@@ -0,0 +1,376 @@
+import logging
+import time
+
+from django.utils import timezone
+from django.utils.text import slugify
+from shop.models import Product, Category, ProductImage
+
+from DjangoAdCrawler.bundle import ImageBundle
+from DjangoAdCrawler.executors import get_executor
+from DjangoAdCrawler.models import ImportProgress
+from DjangoAdCrawler.storage import get_storage_writer
+from DjangoAdCrawler.throttling import update_progress_rate
+from DjangoAdCrawler.utils import ImageRedirectResolver, split_image_urls
+
+logger = logging.getLogger('import_logger')
+
+PAUSE_MINUTES = 5
+# Через сколько скачанных изображений делать паузу
+IMAGES_PER_PAUSE = 10
+
+
+class _ImportPaused(Exception):
+    def __init__(self, wait_until):
+        super().__init__(wait_until)
+        self.wait_until = wait_until
+
+
+class _ImportStopped(Exception):
+    pass
+
+
+class ImportEngine:
+    """
+    Единое ядро импорта товаров из CSV для всех режимов запуска.
+    Где выполняется импорт и как параллелится скачивание изображений,
+    задаёт исполнитель (см. executors.py). Кэш редиректов, пакетная
+    запись, регулирование скорости и замеры стадий общие для всех.
+    Если указан bundle_path, изображения читаются из заранее
+    скачанного пакета (см. bundle.py) без обращения к сети.
+    run_id связывает запуск с ImportProgress: если пользователь нажал
+    «Стоп» или начал новый импорт, запуск со старым run_id завершается.
+    """
+    def __init__(
+        self, rows, columns, mapping, selected_category_id=None, user=None,
+        start_row=1, executor=None, bundle_path=None, run_id=None
+    ):
+        self.rows = rows
+        self.columns = columns
+        self.mapping = mapping
+        self.selected_category_id = selected_category_id
+        self.user = user
+        self.start_row = start_row
+        self.bundle_path = bundle_path
+        self.run_id = run_id
+        self.executor = executor or get_executor()
+        self.progress_obj = None
+        self.imported = 0
+        self.skipped_duplicates = 0
+        self.images_downloaded = 0
+        self.last_success_row = start_row - 1
+        # Последняя строка, изображения которой уже записаны в хранилище;
+        # дальше неё прогресс не сохраняется
+        self.stored_row = start_row - 1
+        self.stats = {
+            'rows': 0,
+            'images': 0,
+            'fetch_seconds': 0.0,
+            'store_seconds': 0.0,
+            'total_seconds': 0.0,
+        }
+        self._categories = {}
+
+    def start(self):
+        """
+        Запускает импорт через исполнитель: синхронно или постановкой
+        в очередь (тогда статус результата — 'queued').
+        """
+        return self.executor.start(self)
+
+    def _result(self, status, **extra):
+        result = {
+            'imported': self.imported,
+            'last_success_row': self.stored_row,
+            'status': status,
+            'skipped_duplicates': self.skipped_duplicates,
+            'stats': dict(self.stats),
+        }
+        result.update(extra)
+        return result
+
+    def _load_progress(self):
+        """
+        Подхватывает ImportProgress пользователя. Возвращает результат
+        со статусом 'stopped', если импорт остановлен или заменён новым,
+        и 'waiting', если пауза ещё не истекла.
+        """
+        progress_obj = ImportProgress.objects.filter(user=self.user)\
+            .order_by('-id').first()
+        if not progress_obj:
+            progress_obj = ImportProgress.objects.create(
+                user=self.user,
+                last_success_row=self.last_success_row,
+                images_downloaded=0,
+                status='running',
+                pause_until=None,
+                pause_minutes=PAUSE_MINUTES,
+                total_rows=len(self.rows) - 1 if self.rows else 0,
+                run_id=self.run_id or '',
+            )
+        self.progress_obj = progress_obj
+        if self._is_cancelled(progress_obj.status, progress_obj.run_id):
+            logger.info(f'Import {self.run_id} is stopped, nothing to run')
+            return self._result('stopped')
+        self.last_success_row = progress_obj.last_success_row
+        self.stored_row = progress_obj.last_success_row
+        self.images_downloaded = progress_obj.images_downloaded
+        if progress_obj.total_rows == 0 and self.rows:
+            progress_obj.total_rows = len(self.rows) - 1
+            progress_obj.save(update_fields=['total_rows'])
+        if progress_obj.status in ['paused', 'waiting'] and progress_obj.pause_until:
+            if timezone.now() < progress_obj.pause_until:
+                progress_obj.status = 'waiting'
+                progress_obj.save(update_fields=['status'])
+                return self._result('waiting', wait_until=progress_obj.pause_until)
+            progress_obj.status = 'running'
+            progress_obj.save(update_fields=['status'])
+        return None
+
+    def _is_cancelled(self, status, run_id):
+        if status == 'stopped':
+            return True
+        return bool(self.run_id and run_id and run_id != self.run_id)
+
+    def is_cancelled(self):
+        """
+        Перечитывает ImportProgress: нажат ли «Стоп» или запущен
+        новый импорт с другим run_id.
+        """
+        if not self.progress_obj:
+            return False
+        current = ImportProgress.objects.filter(pk=self.progress_obj.pk)\
+            .values('status', 'run_id').first()
+        if current is None:
+            return True
+        return self._is_cancelled(current['status'], current['run_id'])
+
+    def _save_progress(self, **fields):
+        """
+        Сохраняет прогресс, если запуск не отменён; иначе прерывает
+        импорт, чтобы не затереть статус 'stopped' или чужой запуск.
+        """
+        if not self.progress_obj:
+            return
+        if self.is_cancelled():
+            raise _ImportStopped()
+        for name, value in fields.items():
+            setattr(self.progress_obj, name, value)
+        self.progress_obj.images_downloaded = self.images_downloaded
+        update_progress_rate(self.progress_obj, self.resolver.throttle)
+        self.progress_obj.save()
+
+    def _get_category(self, data):
+        category_value = self.mapping['category'] and data.get(self.mapping['category'])
+        key = category_value or None
+        if key in self._categories:
+            return self._categories[key]
+        category = None
+        if category_value:
+            category, _ = Category.objects.get_or_create(name=category_value)
+        elif self.selected_category_id:
+            category = Category.objects.filter(id=self.selected_category_id).first()
+        self._categories[key] = category
+        return category
+
+    def _flush(self, force=True):
+        """
+        Выгружает очередь писателя. Возвращает True, если очередь пуста
+        и все завершённые строки записаны (stored_row обновлён).
+        """
+        started = time.monotonic()
+        if force:
+            self.writer.flush()
+        else:
+            self.writer.flush_if_full()
+        self.stats['store_seconds'] += time.monotonic() - started
+        if self.writer.pending:
+            return False
+        self.stored_row = self.last_success_row
+        return True
+
+    def _pause_on_429(self, i, product, img_url):
+        logger.warning(f'Paused import at row {i} due to 429 for image {img_url}')
+        # Строка i не завершена: её изображения не выгружаем, иначе при
+        # продолжении товар с главным фото сочтётся дубликатом и
+        # остальные изображения не докачаются
+        self.writer.discard(product)
+        self._flush()
+        self.resolver.throttle.persist()
+        pause_minutes = self.resolver.throttle.pause_minutes()
+        wait_until = timezone.now() + timezone.timedelta(minutes=pause_minutes)
+        self._save_progress(
+            last_success_row=self.stored_row,
+            status='paused',
+            pause_minutes=pause_minutes,
+            pause_until=wait_until,
+        )
+        raise _ImportPaused(wait_until)
+
+    def _pause_after_batch(self, i):
+        pause_minutes = self.resolver.throttle.pause_minutes()
+        if not pause_minutes:
+            return
+        logger.info(
+            f'Pause {pause_minutes} min after {self.images_downloaded} images'
+        )
+        self._flush()
+        self._save_progress(
+            last_success_row=self.stored_row,
+            status='waiting',
+            pause_minutes=pause_minutes,
+            pause_until=timezone.now() + timezone.timedelta(minutes=pause_minutes),
+        )
+        time.sleep(pause_minutes * 60)
+        if self.is_cancelled():
+            raise _ImportStopped()
+
+    def _import_images(self, i, product, img_urls):
+        logger.info(f'Image URLs for {product.name}: {img_urls}')
+        started = time.monotonic()
+        try:
+            fetched_images = self.resolver.fetch_many(img_urls, executor=self.executor)
+        except Exception as e:
+            logger.error(f'Error fetching images for {product.name}: {e}')
+            return
+        finally:
+            self.stats['fetch_seconds'] += time.monotonic() - started
+        for idx, (img_url, fetched) in enumerate(zip(img_urls, fetched_images)):
+            if fetched.status_code == 429:
+                self._pause_on_429(i, product, img_url)
+            if not fetched.downloaded:
+                logger.warning(f'Skip rejected image target {img_url}')
+                continue
+            self.images_downloaded += 1
+            if self.images_downloaded % IMAGES_PER_PAUSE == 0:
+                self._pause_after_batch(i)
+            if not fetched.content:
+                logger.warning(f'Failed to get image content for {img_url}')
+                continue
+            try:
+                img_name = f"{product.slug}-{idx}.jpg"
+                if idx == 0:
+                    self.writer.add_main(product, img_name, fetched.content)
+                    logger.info(f'Queued main image {img_name} for {product.name}')
+                else:
+                    self.writer.add_gallery(product, img_name, fetched.content)
+                    logger.info(f'Queued gallery image {img_name} for {product.name}')
+                self.stats['images'] += 1
+            except Exception as e:
+                logger.error(f'Error queueing image {img_url}: {e}')
+
+    def _lost_images(self, product, img_urls):
+        """
+        Товар создан, но его изображения так и не были записаны
+        (импорт прервался до выгрузки очереди) — их надо докачать.
+        """
+        if not img_urls or product.image:
+            return False
+        return not ProductImage.objects.filter(product=product).exists()
+
+    def _import_row(self, i, row):
+        if self.is_cancelled():
+            raise _ImportStopped()
+        data = dict(zip(self.columns, row))
+        name = data.get(self.mapping['name'])
+        price = data.get(self.mapping['price'])
+        description = data.get(self.mapping['description'])
+        avito_id = data.get(self.mapping['avito_id'])
+        images_raw = data.get(self.mapping['images'])
+        category = self._get_category(data)
+        if not name or not avito_id or not category:
+            logger.warning(
+                f'Skip row: name={name}, avito_id={avito_id}, category={category}'
+            )
+            return
+        img_urls = split_image_urls(images_raw)
+        product = Product.objects.filter(avito_id=avito_id).first()
+        if product and not self._lost_images(product, img_urls):
+            logger.info(f'Skip duplicate avito_id={avito_id}')
+            self.skipped_duplicates += 1
+            return
+        if product:
+            logger.info(f'Resume images for avito_id={avito_id}')
+        else:
+            product = Product.objects.create(
+                name=name,
+                price=price or 0,
+                description=description or '',
+                avito_id=avito_id,
+                available=True,
+                category=category,
+                slug=slugify(f"{name}-{avito_id}"),
+            )
+            logger.info(
+                f'Created product: name={name}, avito_id={avito_id}, category={category}'
+            )
+        if img_urls:
+            self._import_images(i, product, img_urls)
+        self.imported += 1
+        self.last_success_row = i
+        self.stats['rows'] += 1
+        self._flush(force=False)
+        self.resolver.throttle.persist()
+        self._save_progress(last_success_row=self.stored_row, status='running')
+        logger.info(f'Imported product: {name} (avito_id={avito_id})')
+
+    def _log_stats(self):
+        stats = self.stats
+        logger.info(
+            f'=== IMPORT STATS === executor={self.executor.name}, '
+            f'rows={stats["rows"]}, images={stats["images"]}, '
+            f'fetch={stats["fetch_seconds"]:.1f}s, '
+            f'store={stats["store_seconds"]:.1f}s, '
+            f'total={stats["total_seconds"]:.1f}s'
+            + (
+                f', missing in bundle={stats["missing_images"]}'
+                if 'missing_images' in stats else ''
+            )
+        )
+
+    def run(self):
+        """
+        Выполняет импорт в текущем процессе начиная со start_row.
+        :return: dict с количеством импортированных, позицией, статусом
+            и замерами стадий (stats)
+        """
+        logger.info(
+            f"=== START IMPORT === executor={self.executor.name}, "
+            f"bundle={self.bundle_path}, start_row={self.start_row}, rows={len(self.rows) if self.rows else 0}, "
+            f"columns={self.columns}, mapping={self.mapping}, "
+            f"selected_category_id={self.selected_category_id}, user={self.user}"
+        )
+        started = time.monotonic()
+        self.writer = get_storage_writer()
+        if self.user:
+            early_result = self._load_progress()
+            if early_result:
+                return early_result
+        try:
+            if self.bundle_path:
+                self.resolver = ImageBundle(self.bundle_path)
+            else:
+                self.resolver = ImageRedirectResolver()
+            for i, row in enumerate(self.rows[self.start_row:], start=self.start_row):
+                self._import_row(i, row)
+            self._flush()
+            self._save_progress(last_success_row=self.stored_row, status='completed')
+            status, extra = 'completed', {}
+        except _ImportPaused as paused:
+            status, extra = 'paused', {'wait_until': paused.wait_until}
+        except _ImportStopped:
+            logger.info(f'Import stopped at row {self.stored_row}')
+            status, extra = 'stopped', {}
+        except Exception as e:
+            logger.exception(f'Import failed at row {self.stored_row}: {e}')
+            status, extra = 'error', {'error': str(e)}
+            if self.progress_obj:
+                self.progress_obj.status = 'error'
+                self.progress_obj.last_message = str(e)
+                self.progress_obj.last_success_row = self.stored_row
+                self.progress_obj.save()
+        finally:
+            self.stats['total_seconds'] = time.monotonic() - started
+            if isinstance(getattr(self, 'resolver', None), ImageBundle):
+                self.stats['missing_images'] = len(self.resolver.missing)
+            self._log_stats()
+        return self._result(status, **extra)
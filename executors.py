@@ -0,0 +1,109 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from DjangoAdCrawler.throttling import MAX_CONCURRENCY
+
+DEFAULT_EXECUTOR = 'thread'
+
+
+class InlineExecutor:
+    """
+    Исполнитель импорта: определяет, где запускается ImportEngine.run()
+    (start) и как параллельно выполняются сетевые задачи (map).
+    Базовый вариант делает всё в текущем потоке по очереди.
+    """
+    name = 'inline'
+
+    def start(self, engine):
+        return engine.run()
+
+    def map(self, fn, items):
+        return [fn(item) for item in items]
+
+
+class ThreadPoolImportExecutor(InlineExecutor):
+    """
+    Запуск в текущем процессе, изображения скачиваются пулом потоков.
+    Фактическую параллельность ограничивает регулятор скорости хоста.
+    """
+    name = 'thread'
+
+    def __init__(self, max_workers=MAX_CONCURRENCY):
+        self.max_workers = max_workers
+
+    def map(self, fn, items):
+        items = list(items)
+        workers = min(self.max_workers, len(items)) or 1
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(fn, items))
+
+
+class AsyncioExecutor(InlineExecutor):
+    """
+    Задачи выполняются в цикле asyncio с семафором; блокирующие
+    запросы requests уходят в пул потоков цикла.
+    """
+    name = 'asyncio'
+
+    def __init__(self, max_workers=MAX_CONCURRENCY):
+        self.max_workers = max_workers
+
+    async def _gather(self, fn, items):
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def call(item):
+            async with semaphore:
+                return await loop.run_in_executor(None, fn, item)
+
+        return await asyncio.gather(*(call(item) for item in items))
+
+    def map(self, fn, items):
+        return list(asyncio.run(self._gather(fn, items)))
+
+
+class CeleryExecutor(ThreadPoolImportExecutor):
+    """
+    Ставит импорт в очередь Celery. Внутри воркера изображения
+    скачиваются пулом потоков, паузы переживаются через retry.
+    """
+    name = 'celery'
+
+    def start(self, engine):
+        from DjangoAdCrawler.import_csv_avito import import_products_from_csv_task
+        task = import_products_from_csv_task.delay(
+            engine.rows,
+            engine.columns,
+            engine.mapping,
+            selected_category_id=engine.selected_category_id,
+            user_id=engine.user.pk if engine.user else None,
+            start_row=engine.start_row,
+            bundle_path=engine.bundle_path,
+            run_id=engine.run_id,
+        )
+        return {
+            'imported': 0,
+            'last_success_row': engine.start_row - 1,
+            'status': 'queued',
+            'skipped_duplicates': 0,
+            'task_id': task.id,
+        }
+
+
+EXECUTORS = {
+    executor_class.name: executor_class
+    for executor_class in (
+        InlineExecutor, ThreadPoolImportExecutor, AsyncioExecutor, CeleryExecutor
+    )
+}
+
+
+def get_executor(name=None):
+    """
+    Возвращает исполнитель по имени (inline, thread, asyncio, celery);
+    по умолчанию берётся из настройки AVITO_IMPORT_EXECUTOR.
+    """
+    name = name or getattr(settings, 'AVITO_IMPORT_EXECUTOR', DEFAULT_EXECUTOR)
+    return EXECUTORS[name]()
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from DjangoAdCrawler.bundle import download_image_bundle
+from DjangoAdCrawler.import_csv_avito import CSV_PATH
+from DjangoAdCrawler.utils import read_csv_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Скачивает изображения из CSV Avito в пакет (каталог с манифестом) '
+        'для последующего импорта без сети. Можно прерывать и продолжать.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('bundle_dir', help='Каталог пакета изображений')
+        parser.add_argument('--csv', default=CSV_PATH, help='Путь к CSV-файлу')
+        parser.add_argument(
+            '--images', required=True,
+            help='Название столбца со ссылками на изображения'
+        )
+        parser.add_argument(
+            '--start-row', type=int, default=None,
+            help='Строка, с которой начать (по умолчанию продолжить после '
+                 'последней обработанной, а после полного прохода — '
+                 'докачать недостающие ссылки с начала CSV)'
+        )
+        parser.add_argument(
+            '--zip', action='store_true',
+            help='Упаковать пакет в .zip по завершении'
+        )
+
+    def handle(self, *args, **options):
+        rows, encoding_used = read_csv_rows(options['csv'])
+        columns = rows[0] if rows else []
+        if options['images'] not in columns:
+            raise CommandError(f'Столбец "{options["images"]}" не найден в CSV')
+        self.stdout.write(f'Кодировка файла: {encoding_used}, строк: {len(rows) - 1}')
+        result = download_image_bundle(
+            rows,
+            columns,
+            options['images'],
+            options['bundle_dir'],
+            start_row=options['start_row'],
+            archive=options['zip'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Скачано: {result["downloaded"]}, отклонено: {result["rejected"]}, '
+            f'всего в пакете: {result["total"]}. Пакет: {result["path"]}'
+        ))
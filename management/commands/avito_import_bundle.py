@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand, CommandError
+
+import os
+import zipfile
+
+from DjangoAdCrawler.bundle import MANIFEST_NAME
+from DjangoAdCrawler.engine import ImportEngine
+from DjangoAdCrawler.executors import get_executor
+from DjangoAdCrawler.import_csv_avito import CSV_PATH, IMPORT_FIELDS
+from DjangoAdCrawler.utils import read_csv_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует товары из CSV Avito, беря изображения из пакета, '
+        'скачанного командой avito_download_bundle. К сети не обращается.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('bundle_path', help='Каталог или .zip пакета изображений')
+        parser.add_argument('--csv', default=CSV_PATH, help='Путь к CSV-файлу')
+        for field, label in IMPORT_FIELDS:
+            parser.add_argument(
+                f'--{field.replace("_", "-")}', dest=field,
+                required=field != 'category',
+                help=f'Столбец: {label}'
+            )
+        parser.add_argument(
+            '--category-id', help='id категории для всех товаров'
+        )
+        parser.add_argument('--start-row', type=int, default=1)
+
+    def handle(self, *args, **options):
+        bundle_path = options['bundle_path']
+        if not (
+            zipfile.is_zipfile(bundle_path)
+            or os.path.isfile(os.path.join(bundle_path, MANIFEST_NAME))
+        ):
+            raise CommandError(f'Пакет {bundle_path} не найден или в нём нет {MANIFEST_NAME}')
+        rows, encoding_used = read_csv_rows(options['csv'])
+        columns = rows[0] if rows else []
+        mapping = {field: options[field] for field, _ in IMPORT_FIELDS}
+        missing = [col for col in mapping.values() if col and col not in columns]
+        if missing:
+            raise CommandError(f'Столбцы не найдены в CSV: {", ".join(missing)}')
+        if not mapping['category'] and not options['category_id']:
+            raise CommandError('Укажите --category или --category-id')
+        self.stdout.write(f'Кодировка файла: {encoding_used}, строк: {len(rows) - 1}')
+        result = ImportEngine(
+            rows,
+            columns,
+            mapping,
+            selected_category_id=options['category_id'],
+            start_row=options['start_row'],
+            executor=get_executor('inline'),
+            bundle_path=bundle_path,
+        ).run()
+        if result['status'] == 'error':
+            raise CommandError(f'Ошибка импорта: {result["error"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано товаров: {result["imported"]}, '
+            f'пропущено дубликатов: {result["skipped_duplicates"]}, '
+            f'последняя строка: {result["last_success_row"]}'
+        ))
+        missing = result['stats'].get('missing_images', 0)
+        if missing:
+            self.stdout.write(self.style.WARNING(
+                f'Изображений нет в пакете: {missing} — докачайте их командой '
+                f'avito_download_bundle с тем же CSV (при необходимости с --start-row 1)'
+            ))
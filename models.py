@@ -28,12 +28,55 @@ class ImportProgress(models.Model):
     )
     pause_until = models.DateTimeField(null=True, blank=True)
     pause_minutes = models.IntegerField(default=10)  # в минутах
-    extra_delay_after_429 = models.IntegerField(default=0)  # в минутах
+    request_rate = models.FloatField(default=0.0)  # запросов в минуту
+    concurrency = models.IntegerField(default=1)
     last_message = models.TextField(blank=True, default='')
     stopped_by_user = models.BooleanField(default=False)
+    # Идентификатор текущего запуска; запуски с другим run_id завершаются
+    run_id = models.CharField(max_length=32, blank=True, default='')
 
     def __str__(self):
         return f"Импорт {self.pk} ({self.get_status_display()})"
 
     class Meta:
         app_label = 'DjangoAdCrawler'
+
+
+class ImageRedirect(models.Model):
+    """
+    Кэш редиректов ссылок на изображения Avito.
+    Хранит конечный адрес файла, чтобы не разрешать редирект повторно
+    при следующих строках и повторных импортах.
+    """
+    source_url = models.URLField(max_length=1000, unique=True)
+    final_url = models.URLField(max_length=1000, blank=True, default='')
+    is_image = models.BooleanField(default=False)
+    status_code = models.IntegerField(default=0)
+    resolved_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source_url} -> {self.final_url or '—'}"
+
+    class Meta:
+        app_label = 'DjangoAdCrawler'
+
+
+class HostThrottle(models.Model):
+    """
+    Параметры скорости запросов к хосту, подобранные адаптивным
+    контроллером. Сохраняются между запусками импорта.
+    """
+    host = models.CharField(max_length=255, unique=True)
+    delay_seconds = models.FloatField(default=5.0)
+    concurrency = models.IntegerField(default=1)
+    pause_minutes = models.IntegerField(default=5)  # в минутах
+    avg_latency = models.FloatField(default=0.0)  # в секундах
+    requests_total = models.IntegerField(default=0)
+    throttled_total = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.host}: {60 / self.delay_seconds:.1f} запр./мин"
+
+    class Meta:
+        app_label = 'DjangoAdCrawler'
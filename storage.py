@@ -0,0 +1,125 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils.module_loading import import_string
+from shop.models import Product, ProductImage
+
+logger = logging.getLogger('import_logger')
+
+DEFAULT_STORAGE_WRITER = 'DjangoAdCrawler.storage.ConcurrentStorageWriter'
+# Сколько файлов копить в очереди перед выгрузкой
+STORAGE_BATCH_SIZE = 20
+STORAGE_WORKERS = 4
+
+
+class StorageWriter:
+    """
+    Стадия записи изображений, отделённая от скачивания.
+    Файлы копятся в очереди и выгружаются пачкой через storage
+    соответствующих полей моделей, после чего строки в базе
+    обновляются одним bulk_update и одним bulk_create.
+    Базовый класс выгружает файлы последовательно.
+    """
+    def __init__(self, batch_size=STORAGE_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._main = []
+        self._gallery = []
+
+    @property
+    def pending(self):
+        return len(self._main) + len(self._gallery)
+
+    def add_main(self, product, name, content):
+        self._main.append((product, name, content))
+
+    def add_gallery(self, product, name, content):
+        self._gallery.append((ProductImage(product=product), name, content))
+
+    def discard(self, product):
+        """
+        Убирает из очереди ещё не выгруженные файлы товара — например,
+        когда строка прервана и будет импортирована заново.
+        """
+        self._main = [job for job in self._main if job[0].pk != product.pk]
+        self._gallery = [
+            job for job in self._gallery if job[0].product_id != product.pk
+        ]
+
+    def flush_if_full(self):
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def _upload(self, job):
+        instance, name, content = job
+        field = instance._meta.get_field('image')
+        return field.storage.save(
+            field.generate_filename(instance, name),
+            ContentFile(content),
+            max_length=field.max_length,
+        )
+
+    def _upload_safe(self, job):
+        """
+        Выгружает один файл; при ошибке хранилища пишет её в лог
+        и возвращает None, не прерывая выгрузку остальной пачки.
+        """
+        try:
+            return self._upload(job)
+        except Exception as e:
+            logger.error(f'Error storing image {job[1]}: {e}')
+            return None
+
+    def _upload_all(self, jobs):
+        return [self._upload_safe(job) for job in jobs]
+
+    def flush(self):
+        if not self.pending:
+            return
+        main, gallery = self._main, self._gallery
+        self._main, self._gallery = [], []
+        saved_names = self._upload_all(main + gallery)
+        products = []
+        for (product, _, _), saved_name in zip(main, saved_names):
+            if saved_name:
+                product.image.name = saved_name
+                products.append(product)
+        images = []
+        for (image, _, _), saved_name in zip(gallery, saved_names[len(main):]):
+            if saved_name:
+                image.image.name = saved_name
+                images.append(image)
+        if products:
+            Product.objects.bulk_update(products, ['image'])
+        if images:
+            ProductImage.objects.bulk_create(images)
+        logger.info(
+            f'Stored {len(products)} main and {len(images)} gallery images'
+        )
+
+
+class ConcurrentStorageWriter(StorageWriter):
+    """
+    Выгружает файлы пачки параллельно — полезно для удалённых
+    хранилищ (S3 и т.п.), где каждая запись — сетевой запрос.
+    """
+    def __init__(self, batch_size=STORAGE_BATCH_SIZE, max_workers=STORAGE_WORKERS):
+        super().__init__(batch_size=batch_size)
+        self.max_workers = max_workers
+
+    def _upload_all(self, jobs):
+        workers = min(self.max_workers, len(jobs)) or 1
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(self._upload_safe, jobs))
+
+
+def get_storage_writer():
+    """
+    Создаёт писатель из настройки AVITO_IMPORT_STORAGE_WRITER
+    (путь к классу), по умолчанию ConcurrentStorageWriter.
+    """
+    writer_class = import_string(
+        getattr(settings, 'AVITO_IMPORT_STORAGE_WRITER', DEFAULT_STORAGE_WRITER)
+    )
+    return writer_class()
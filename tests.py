@@ -1,3 +1,557 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from shop.models import Category, Product, ProductImage
+
+from DjangoAdCrawler.bundle import (
+    MANIFEST_NAME, ImageBundle, _image_file_name, load_manifest, save_manifest
+)
+from DjangoAdCrawler.engine import ImportEngine
+from DjangoAdCrawler.executors import (
+    AsyncioExecutor, InlineExecutor, ThreadPoolImportExecutor, get_executor
+)
+from DjangoAdCrawler.models import HostThrottle, ImageRedirect, ImportProgress
+from DjangoAdCrawler.storage import (
+    ConcurrentStorageWriter, StorageWriter, get_storage_writer
+)
+from DjangoAdCrawler.throttling import (
+    INCREASE_AFTER, MAX_CONCURRENCY, MIN_DELAY, HostRateController,
+    HostThrottleRegistry
+)
+from DjangoAdCrawler.utils import (
+    REJECTION_TTL, ImageRedirectResolver, is_image_response, split_image_urls
+)
 
 # Create your tests here.
+
+
+class SplitImageUrlsTests(SimpleTestCase):
+    def test_separators(self):
+        for sep in ['|', ';', ',']:
+            self.assertEqual(
+                split_image_urls(f' http://a/1 {sep}http://a/2{sep} '),
+                ['http://a/1', 'http://a/2'],
+            )
+
+    def test_single_and_empty(self):
+        self.assertEqual(split_image_urls(' http://a/1 '), ['http://a/1'])
+        self.assertEqual(split_image_urls(''), [])
+        self.assertEqual(split_image_urls(None), [])
+        self.assertEqual(split_image_urls('   '), [])
+
+
+class IsImageResponseTests(SimpleTestCase):
+    url = 'https://00.img.avito.st/image/1/abc'
+
+    def test_accepts_avito_image(self):
+        self.assertTrue(is_image_response(self.url, 200, 'image/jpeg'))
+        self.assertTrue(is_image_response(self.url, 200, 'IMAGE/WEBP; q=1'))
+        self.assertTrue(is_image_response(self.url, 200, None))
+
+    def test_rejects_wrong_host_type_or_status(self):
+        self.assertFalse(is_image_response('https://www.avito.ru/blocked', 200, 'image/jpeg'))
+        self.assertFalse(is_image_response(self.url, 200, 'text/html; charset=utf-8'))
+        self.assertFalse(is_image_response(self.url, 403, 'image/jpeg'))
+        self.assertFalse(is_image_response(None, 200, 'image/jpeg'))
+
+
+class HostRateControllerTests(SimpleTestCase):
+    def make_controller(self, **fields):
+        return HostRateController(HostThrottle(host='img.avito.st', **fields))
+
+    def test_429_backs_off(self):
+        controller = self.make_controller(delay_seconds=4.0, concurrency=4, pause_minutes=4)
+        controller.record_response(429, 0.1)
+        self.assertEqual(controller.delay, 8.0)
+        self.assertEqual(controller.concurrency, 2)
+        self.assertEqual(controller.pause_minutes, 6)
+        self.assertTrue(controller.dirty)
+        self.assertEqual(controller.throttle_rate, 1.0)
+        self.assertTrue(controller.throttled_since(0))
+
+    def test_fast_successes_speed_up(self):
+        controller = self.make_controller(delay_seconds=5.0, concurrency=1, pause_minutes=5)
+        for _ in range(INCREASE_AFTER):
+            controller.record_response(200, 0.2)
+        self.assertEqual(controller.delay, 4.0)
+        self.assertEqual(controller.concurrency, 2)
+        self.assertEqual(controller.pause_minutes, 4)
+        self.assertEqual(controller.success_rate, 1.0)
+
+    def test_speed_is_bounded(self):
+        controller = self.make_controller(delay_seconds=MIN_DELAY, concurrency=MAX_CONCURRENCY)
+        for _ in range(INCREASE_AFTER * 3):
+            controller.record_response(200, 0.2)
+        self.assertEqual(controller.delay, MIN_DELAY)
+        self.assertEqual(controller.concurrency, MAX_CONCURRENCY)
+
+    def test_no_speed_up_while_throttled_window(self):
+        controller = self.make_controller(delay_seconds=5.0, concurrency=1)
+        for _ in range(3):
+            controller.record_response(429, 0.2)
+        delay = controller.delay
+        for _ in range(INCREASE_AFTER):
+            controller.record_response(200, 0.2)
+        self.assertGreater(controller.throttle_rate, 0.1)
+        self.assertEqual(controller.delay, delay)
+
+    def test_frequent_429_backs_off_harder(self):
+        controller = self.make_controller(delay_seconds=1.0, concurrency=1)
+        for _ in range(8):
+            controller.record_response(200, 0.2)
+        controller.record_response(429, 0.2)
+        self.assertEqual(controller.delay, 2.0)
+        controller.record_response(429, 0.2)
+        self.assertEqual(controller.delay, 8.0)
+
+    def test_slow_responses_back_off(self):
+        controller = self.make_controller(delay_seconds=4.0, concurrency=2)
+        controller.record_response(200, 10.0)
+        self.assertEqual(controller.delay, 5.0)
+        self.assertEqual(controller.concurrency, 1)
+
+
+class HostThrottleRegistryTests(TestCase):
+    def test_save_copies_state_to_record(self):
+        controller = HostThrottleRegistry().for_url('https://img.avito.st/image/1')
+        controller.delay = 4.0
+        controller.record_response(429, 0.1)
+        controller.save()
+        record = HostThrottle.objects.get(host='img.avito.st')
+        self.assertEqual(record.delay_seconds, 8.0)
+        self.assertEqual(record.throttled_total, 1)
+        self.assertFalse(controller.dirty)
+
+    def test_host_created_by_parallel_run(self):
+        registry = HostThrottleRegistry()
+        controller = registry.for_url('https://img.avito.st/image/1')
+        HostThrottle.objects.create(host='img.avito.st')
+        controller.record_response(429, 0.1)
+        registry.persist()
+        self.assertEqual(HostThrottle.objects.filter(host='img.avito.st').count(), 1)
+        self.assertEqual(HostThrottle.objects.get(host='img.avito.st').throttled_total, 1)
+
+
+class ImageBundleTests(SimpleTestCase):
+    url = 'https://www.avito.ru/img/1'
+    rejected_url = 'https://www.avito.ru/img/2'
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.bundle_dir = os.path.join(self.tmp, 'bundle')
+        os.makedirs(os.path.join(self.bundle_dir, 'images'))
+        file_name = _image_file_name(self.url)
+        with open(os.path.join(self.bundle_dir, file_name), 'wb') as f:
+            f.write(b'jpeg-bytes')
+        save_manifest(self.bundle_dir, {
+            'version': 1,
+            'last_row': 3,
+            'images': {
+                self.url: {
+                    'file': file_name,
+                    'final_url': 'https://00.img.avito.st/image/1/abc',
+                    'size': 10,
+                },
+                self.rejected_url: {'file': None, 'final_url': None, 'status': 200},
+            },
+        })
+
+    def test_manifest_round_trip(self):
+        manifest = load_manifest(self.bundle_dir)
+        self.assertEqual(manifest['last_row'], 3)
+        self.assertIn(self.url, manifest['images'])
+        self.assertFalse(os.path.exists(
+            os.path.join(self.bundle_dir, f'{MANIFEST_NAME}.tmp')
+        ))
+
+    def test_new_bundle_manifest_is_empty(self):
+        manifest = load_manifest(os.path.join(self.tmp, 'new'))
+        self.assertEqual(manifest['images'], {})
+        self.assertEqual(manifest['last_row'], 0)
+
+    def assert_reads_bundle(self, bundle):
+        fetched = bundle.fetch(self.url)
+        self.assertTrue(fetched.downloaded)
+        self.assertEqual(fetched.content, b'jpeg-bytes')
+        self.assertEqual(fetched.status_code, 200)
+        rejected = bundle.fetch(self.rejected_url)
+        self.assertFalse(rejected.downloaded)
+        self.assertIsNone(rejected.content)
+        missing = bundle.fetch_many(['https://www.avito.ru/img/3'])[0]
+        self.assertFalse(missing.downloaded)
+        self.assertEqual(bundle.missing, {'https://www.avito.ru/img/3'})
+        self.assertEqual(bundle.throttle.pause_minutes(), 0)
+
+    def test_reads_directory(self):
+        self.assert_reads_bundle(ImageBundle(self.bundle_dir))
+
+    def test_reads_zip(self):
+        path = shutil.make_archive(self.bundle_dir, 'zip', self.bundle_dir)
+        self.assert_reads_bundle(ImageBundle(path))
+
+    def test_missing_bundle_raises(self):
+        with self.assertRaises(FileNotFoundError):
+            ImageBundle(os.path.join(self.tmp, 'nonexistent.zip'))
+        os.remove(os.path.join(self.bundle_dir, MANIFEST_NAME))
+        with self.assertRaises(FileNotFoundError):
+            ImageBundle(self.bundle_dir)
+
+    def test_zip_without_manifest_raises(self):
+        os.remove(os.path.join(self.bundle_dir, MANIFEST_NAME))
+        path = shutil.make_archive(self.bundle_dir, 'zip', self.bundle_dir)
+        with self.assertRaises(FileNotFoundError):
+            ImageBundle(path)
+
+
+def fake_response(status_code, url, content_type='image/jpeg', content=b'jpeg-bytes'):
+    return mock.Mock(
+        status_code=status_code, url=url,
+        headers={'Content-Type': content_type}, content=content,
+    )
+
+
+class ImageRedirectResolverTests(TestCase):
+    url = 'https://www.avito.ru/img/1'
+    image_url = 'https://00.img.avito.st/image/1/abc'
+
+    def setUp(self):
+        # Без задержек регулятора между запросами
+        for host in ['www.avito.ru', '00.img.avito.st']:
+            HostThrottle.objects.create(host=host, delay_seconds=0.01)
+        patcher = mock.patch('DjangoAdCrawler.utils.requests.request')
+        self.request = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def methods(self):
+        return [c.args[0] for c in self.request.call_args_list]
+
+    def test_cache_reused_across_instances(self):
+        self.request.return_value = fake_response(200, self.image_url)
+        self.assertEqual(ImageRedirectResolver().resolve(self.url).final_url, self.image_url)
+        resolved = ImageRedirectResolver().resolve(self.url)
+        self.assertEqual(resolved.final_url, self.image_url)
+        self.assertEqual(self.methods(), ['HEAD'])
+
+    def test_rejected_target_is_not_downloaded(self):
+        self.request.return_value = fake_response(200, 'https://www.avito.ru/blocked', 'text/html')
+        fetched = ImageRedirectResolver().fetch_many([self.url], executor=InlineExecutor())[0]
+        self.assertFalse(fetched.downloaded)
+        self.assertIsNone(fetched.content)
+        self.assertEqual(self.methods(), ['HEAD'])
+        self.assertFalse(ImageRedirect.objects.get(source_url=self.url).is_image)
+
+    def test_rejection_expires(self):
+        self.request.return_value = fake_response(200, 'https://www.avito.ru/blocked', 'text/html')
+        ImageRedirectResolver().resolve(self.url)
+        ImageRedirectResolver().resolve(self.url)
+        self.assertEqual(self.methods(), ['HEAD'])
+        ImageRedirect.objects.update(resolved_at=timezone.now() - REJECTION_TTL * 2)
+        self.request.return_value = fake_response(200, self.image_url)
+        self.assertEqual(ImageRedirectResolver().resolve(self.url).final_url, self.image_url)
+        self.assertEqual(self.methods(), ['HEAD', 'HEAD'])
+
+    def test_not_final_status_is_not_cached(self):
+        self.request.return_value = fake_response(403, self.url, 'text/html')
+        self.assertIsNone(ImageRedirectResolver().resolve(self.url).final_url)
+        self.assertFalse(ImageRedirect.objects.exists())
+
+    def test_head_falls_back_to_streamed_get(self):
+        get_response = fake_response(200, self.image_url)
+        self.request.side_effect = [fake_response(405, self.url, None), get_response]
+        resolved = ImageRedirectResolver().resolve(self.url)
+        self.assertEqual(resolved.final_url, self.image_url)
+        self.assertEqual(self.methods(), ['HEAD', 'GET'])
+        self.assertTrue(self.request.call_args.kwargs['stream'])
+        get_response.close.assert_called_once_with()
+
+    def test_prefetch_stops_at_429(self):
+        self.request.return_value = fake_response(429, self.url, 'text/html')
+        other_url = 'https://www.avito.ru/img/2'
+        resolved = ImageRedirectResolver().prefetch([self.url, other_url])
+        self.assertEqual(resolved[self.url].status_code, 429)
+        self.assertNotIn(other_url, resolved)
+        self.assertEqual(self.methods(), ['HEAD'])
+        fetched = ImageRedirectResolver().fetch_many(
+            [self.url, other_url], executor=InlineExecutor()
+        )
+        self.assertEqual([f.status_code for f in fetched], [429, 429])
+
+    def test_stale_target_is_invalidated(self):
+        ImageRedirect.objects.create(
+            source_url=self.url, final_url=self.image_url, is_image=True, status_code=200
+        )
+        self.request.return_value = fake_response(404, self.image_url, 'text/html')
+        fetched = ImageRedirectResolver().fetch_many([self.url], executor=InlineExecutor())[0]
+        self.assertIsNone(fetched.content)
+        self.assertEqual(self.methods(), ['GET'])
+        self.assertFalse(ImageRedirect.objects.filter(source_url=self.url).exists())
+
+    def test_downloads_resolved_image(self):
+        self.request.return_value = fake_response(200, self.image_url)
+        fetched = ImageRedirectResolver().fetch_many([self.url], executor=InlineExecutor())[0]
+        self.assertTrue(fetched.downloaded)
+        self.assertEqual(fetched.content, b'jpeg-bytes')
+        self.assertEqual(self.methods(), ['HEAD', 'GET'])
+        self.assertEqual(self.request.call_args.args[1], self.image_url)
+
+
+def make_product(avito_id, category=None):
+    category = category or Category.objects.get_or_create(name='Тест')[0]
+    return Product.objects.create(
+        name=f'Товар {avito_id}', price=1, description='', avito_id=avito_id,
+        available=True, category=category, slug=f'tovar-{avito_id}',
+    )
+
+
+class MediaRootMixin:
+    """
+    Файлы изображений пишутся во временный MEDIA_ROOT.
+    """
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+
+class StorageWriterTests(MediaRootMixin, TestCase):
+    writer_class = StorageWriter
+
+    def setUp(self):
+        super().setUp()
+        self.product = make_product('1')
+
+    def test_flush_if_full(self):
+        writer = self.writer_class(batch_size=2)
+        writer.add_main(self.product, 'main.jpg', b'main')
+        writer.flush_if_full()
+        self.assertEqual(writer.pending, 1)
+        self.product.refresh_from_db()
+        self.assertFalse(self.product.image)
+        writer.add_gallery(self.product, 'gallery.jpg', b'gallery')
+        writer.flush_if_full()
+        self.assertEqual(writer.pending, 0)
+
+    def test_flush_updates_rows(self):
+        writer = self.writer_class()
+        writer.add_main(self.product, 'main.jpg', b'main')
+        writer.add_gallery(self.product, 'gallery-1.jpg', b'gallery')
+        writer.add_gallery(self.product, 'gallery-2.jpg', b'gallery')
+        writer.flush()
+        self.product.refresh_from_db()
+        self.assertIn('main', self.product.image.name)
+        self.assertEqual(self.product.image.read(), b'main')
+        self.assertEqual(ProductImage.objects.filter(product=self.product).count(), 2)
+
+    def test_failed_upload_drops_only_its_file(self):
+        writer = self.writer_class()
+        upload = writer._upload
+
+        def failing_upload(job):
+            if job[1] == 'broken.jpg':
+                raise OSError('disk full')
+            return upload(job)
+
+        writer._upload = failing_upload
+        writer.add_main(self.product, 'main.jpg', b'main')
+        writer.add_gallery(self.product, 'broken.jpg', b'gallery')
+        writer.add_gallery(self.product, 'gallery.jpg', b'gallery')
+        writer.flush()
+        self.product.refresh_from_db()
+        self.assertTrue(self.product.image)
+        images = ProductImage.objects.filter(product=self.product)
+        self.assertEqual(images.count(), 1)
+        self.assertIn('gallery', images.get().image.name)
+
+    def test_discard_keeps_other_products(self):
+        other = make_product('2')
+        writer = self.writer_class()
+        writer.add_main(self.product, 'main.jpg', b'main')
+        writer.add_gallery(self.product, 'gallery.jpg', b'gallery')
+        writer.add_main(other, 'other.jpg', b'other')
+        writer.discard(self.product)
+        self.assertEqual(writer.pending, 1)
+        writer.flush()
+        self.product.refresh_from_db()
+        other.refresh_from_db()
+        self.assertFalse(self.product.image)
+        self.assertTrue(other.image)
+
+
+class ConcurrentStorageWriterTests(StorageWriterTests):
+    writer_class = ConcurrentStorageWriter
+
+
+class GetStorageWriterTests(SimpleTestCase):
+    def test_default(self):
+        self.assertIs(type(get_storage_writer()), ConcurrentStorageWriter)
+
+    @override_settings(AVITO_IMPORT_STORAGE_WRITER='DjangoAdCrawler.storage.StorageWriter')
+    def test_setting(self):
+        self.assertIs(type(get_storage_writer()), StorageWriter)
+
+
+class ExecutorTests(SimpleTestCase):
+    def test_map_keeps_order(self):
+        def double(n):
+            # Первые задачи завершаются последними
+            time.sleep((5 - n) * 0.002)
+            return n * 2
+
+        for name in ['inline', 'thread', 'asyncio']:
+            with self.subTest(executor=name):
+                self.assertEqual(get_executor(name).map(double, range(5)), [0, 2, 4, 6, 8])
+
+    def test_default_from_settings(self):
+        self.assertIsInstance(get_executor(), ThreadPoolImportExecutor)
+        with override_settings(AVITO_IMPORT_EXECUTOR='asyncio'):
+            self.assertIsInstance(get_executor(), AsyncioExecutor)
+
+
+class FakeAvito:
+    """
+    Подмена requests.request: www.avito.ru/img/<id> редиректит
+    на 00.img.avito.st/image/<id>, ссылки из throttled получают 429.
+    """
+    def __init__(self):
+        self.throttled = set()
+
+    def __call__(self, method, url, **kwargs):
+        key = url.rsplit('/', 1)[1]
+        if url.startswith('https://www.avito.ru/'):
+            if key in self.throttled:
+                return fake_response(429, url, 'text/html')
+            return fake_response(200, f'https://00.img.avito.st/image/{key}')
+        return fake_response(200, url, content=f'image-{key}'.encode())
+
+
+class ImportEngineTests(MediaRootMixin, TestCase):
+    columns = ['Название', 'Цена', 'Описание', 'Id', 'Фото']
+    mapping = {
+        'name': 'Название', 'price': 'Цена', 'description': 'Описание',
+        'avito_id': 'Id', 'images': 'Фото', 'category': None,
+    }
+
+    def setUp(self):
+        super().setUp()
+        for host in ['www.avito.ru', '00.img.avito.st']:
+            HostThrottle.objects.create(host=host, delay_seconds=0.01)
+        self.avito = FakeAvito()
+        patcher = mock.patch('DjangoAdCrawler.utils.requests.request', side_effect=self.avito)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = get_user_model().objects.create_user('admin')
+        self.category = Category.objects.create(name='Тест')
+
+    def row(self, avito_id, images):
+        return [
+            f'Товар {avito_id}', '100', '', avito_id,
+            '|'.join(f'https://www.avito.ru/img/{key}' for key in images),
+        ]
+
+    def run_engine(self, rows, start_row=1, run_id='run'):
+        return ImportEngine(
+            [self.columns] + rows, self.columns, self.mapping,
+            selected_category_id=self.category.pk, user=self.user,
+            start_row=start_row, executor=InlineExecutor(), run_id=run_id,
+        ).run()
+
+    def progress(self):
+        return ImportProgress.objects.get(user=self.user)
+
+    def assert_images(self, avito_id, gallery):
+        product = Product.objects.get(avito_id=avito_id)
+        self.assertTrue(product.image)
+        self.assertEqual(ProductImage.objects.filter(product=product).count(), gallery)
+
+    def test_completed(self):
+        result = self.run_engine([self.row('1', ['1_0', '1_1']), self.row('2', ['2_0'])])
+        self.assertEqual(result['status'], 'completed')
+        self.assertEqual(result['imported'], 2)
+        self.assertEqual(result['last_success_row'], 2)
+        self.assert_images('1', gallery=1)
+        self.assert_images('2', gallery=0)
+        progress = self.progress()
+        self.assertEqual(progress.status, 'completed')
+        self.assertEqual(progress.last_success_row, 2)
+        self.assertGreater(progress.request_rate, 0)
+
+    def test_skips_duplicates(self):
+        self.run_engine([self.row('1', ['1_0'])])
+        ImportProgress.objects.all().delete()
+        result = self.run_engine([self.row('1', ['1_0']), self.row('2', ['2_0'])])
+        self.assertEqual(result['skipped_duplicates'], 1)
+        self.assertEqual(result['imported'], 1)
+        self.assertEqual(Product.objects.count(), 2)
+
+    def test_429_pauses_and_resumes_unfinished_row(self):
+        rows = [self.row('1', ['1_0']), self.row('5', ['5_0', '5_1', '5_2'])]
+        self.avito.throttled = {'5_1'}
+        result = self.run_engine(rows)
+        self.assertEqual(result['status'], 'paused')
+        # Строка 1 выгружена перед паузой, строка 2 — нет
+        self.assertEqual(result['last_success_row'], 1)
+        self.assert_images('1', gallery=0)
+        self.assertFalse(Product.objects.get(avito_id='5').image)
+        progress = self.progress()
+        self.assertEqual(progress.status, 'paused')
+        self.assertEqual(progress.last_success_row, 1)
+        self.assertGreater(progress.pause_until, timezone.now())
+
+        self.avito.throttled = set()
+        ImportProgress.objects.update(pause_until=timezone.now())
+        result = self.run_engine(rows, start_row=2)
+        self.assertEqual(result['status'], 'completed')
+        self.assertEqual(result['skipped_duplicates'], 0)
+        self.assert_images('5', gallery=2)
+
+    def test_waiting_until_pause_ends(self):
+        ImportProgress.objects.create(
+            user=self.user, status='paused',
+            pause_until=timezone.now() + timezone.timedelta(minutes=5),
+        )
+        result = self.run_engine([self.row('1', ['1_0'])])
+        self.assertEqual(result['status'], 'waiting')
+        self.assertFalse(Product.objects.exists())
+
+    def test_other_run_id_is_stopped(self):
+        ImportProgress.objects.create(user=self.user, status='running', run_id='newer')
+        result = self.run_engine([self.row('1', ['1_0'])], run_id='older')
+        self.assertEqual(result['status'], 'stopped')
+        self.assertFalse(Product.objects.exists())
+        self.assertEqual(self.progress().run_id, 'newer')
+
+    def test_stop_during_import(self):
+        def stop_after_first_row(*args, **kwargs):
+            ImportProgress.objects.update(status='stopped')
+            return self.avito(*args, **kwargs)
+
+        ImportProgress.objects.create(user=self.user, status='running', run_id='run')
+        with mock.patch('DjangoAdCrawler.utils.requests.request', side_effect=stop_after_first_row):
+            result = self.run_engine([self.row('1', ['1_0']), self.row('2', ['2_0'])])
+        self.assertEqual(result['status'], 'stopped')
+        self.assertEqual(Product.objects.count(), 1)
+        self.assertEqual(self.progress().status, 'stopped')
+
+    def test_error_keeps_progress_behind_unflushed_images(self):
+        with mock.patch.object(
+            ImportEngine, '_get_category',
+            side_effect=[self.category, RuntimeError('boom')],
+        ):
+            result = self.run_engine([self.row('1', ['1_0']), self.row('2', ['2_0'])])
+        self.assertEqual(result['status'], 'error')
+        self.assertEqual(result['error'], 'boom')
+        self.assertEqual(result['last_success_row'], 0)
+        progress = self.progress()
+        self.assertEqual(progress.status, 'error')
+        self.assertEqual(progress.last_message, 'boom')
+        self.assertEqual(progress.last_success_row, 0)
@@ -0,0 +1,260 @@
+import logging
+import math
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from DjangoAdCrawler.models import HostThrottle
+
+logger = logging.getLogger('import_logger')
+
+MIN_DELAY = 1.0  # в секундах
+MAX_DELAY = 120.0  # в секундах
+MAX_CONCURRENCY = 4
+MIN_PAUSE_MINUTES = 1
+MAX_PAUSE_MINUTES = 60
+DEFAULT_PAUSE_MINUTES = 5
+# Целевая задержка ответа, выше которой контроллер сбавляет темп
+LATENCY_TARGET = 2.0  # в секундах
+# Сколько успешных ответов подряд нужно для ускорения
+INCREASE_AFTER = 10
+LATENCY_ALPHA = 0.2
+WINDOW_SIZE = 50
+# Минимум ответов в окне, чтобы доли успехов и 429 учитывались
+MIN_WINDOW = 10
+# Доля 429 в окне, выше которой откат на 429 вдвое жёстче
+THROTTLE_RATE_LIMIT = 0.1
+# Доля успешных ответов в окне, ниже которой ускоряться нельзя
+SUCCESS_RATE_TARGET = 0.95
+
+
+class HostRateController:
+    """
+    Адаптивный регулятор запросов к одному хосту (AIMD).
+    На 429 интервал между запросами удваивается, а параллельность
+    делится пополам; серия быстрых успешных ответов постепенно
+    возвращает скорость. Решения учитывают доли успехов и 429
+    в скользящем окне последних ответов. Пауза после пачки
+    изображений тоже подстраивается в обе стороны.
+    """
+    def __init__(self, record):
+        self.record = record
+        self.host = record.host
+        self.delay = record.delay_seconds
+        self.concurrency = record.concurrency
+        self.pause_minutes = record.pause_minutes
+        self.avg_latency = record.avg_latency
+        self.requests_total = record.requests_total
+        self.throttled_total = record.throttled_total
+        self.window = deque(maxlen=WINDOW_SIZE)
+        self.last_throttled_at = None
+        self.dirty = False
+        self._streak = 0
+        self._active = 0
+        self._next_at = 0.0
+        self._cond = threading.Condition()
+
+    @property
+    def rate_per_minute(self):
+        return 60 / self.delay
+
+    @property
+    def throttle_rate(self):
+        if not self.window:
+            return 0.0
+        return sum(1 for ok in self.window if ok is False) / len(self.window)
+
+    @property
+    def success_rate(self):
+        if not self.window:
+            return 1.0
+        return sum(1 for ok in self.window if ok) / len(self.window)
+
+    def throttled_since(self, moment):
+        """
+        Был ли 429 от хоста после moment (значение time.monotonic()).
+        """
+        return self.last_throttled_at is not None and self.last_throttled_at >= moment
+
+    @contextmanager
+    def slot(self):
+        """
+        Ограничивает число одновременных запросов и выдерживает
+        интервал между ними (с разбросом ±40%, как у браузера).
+        """
+        with self._cond:
+            while self._active >= self.concurrency:
+                self._cond.wait()
+            self._active += 1
+            now = time.monotonic()
+            start_at = max(self._next_at, now)
+            self._next_at = start_at + self.delay * random.uniform(0.6, 1.4)
+        wait = start_at - now
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    def _back_off(self, factor):
+        self._streak = 0
+        self.delay = min(MAX_DELAY, self.delay * factor)
+        self.concurrency = max(1, self.concurrency // 2)
+
+    def record_response(self, status_code, latency):
+        with self._cond:
+            self.dirty = True
+            self.requests_total += 1
+            if status_code == 429:
+                self.window.append(False)
+                self.throttled_total += 1
+                self.last_throttled_at = time.monotonic()
+                # Частые 429 в окне — лимит хоста ниже, чем кажется
+                if len(self.window) >= MIN_WINDOW and self.throttle_rate > THROTTLE_RATE_LIMIT:
+                    self._back_off(4)
+                else:
+                    self._back_off(2)
+                self.pause_minutes = min(
+                    MAX_PAUSE_MINUTES, math.ceil(self.pause_minutes * 1.5)
+                )
+                logger.warning(
+                    f'Throttle {self.host}: 429, delay={self.delay:.1f}s, '
+                    f'concurrency={self.concurrency}, pause={self.pause_minutes}m, '
+                    f'429 rate={self.throttle_rate:.0%}'
+                )
+                return
+            self.window.append(status_code < 500)
+            if self.avg_latency:
+                self.avg_latency = (
+                    (1 - LATENCY_ALPHA) * self.avg_latency
+                    + LATENCY_ALPHA * latency
+                )
+            else:
+                self.avg_latency = latency
+            if self.avg_latency > LATENCY_TARGET * 2 or status_code >= 500:
+                self._back_off(1.25)
+                return
+            self._streak += 1
+            if (
+                self._streak >= INCREASE_AFTER
+                and self.avg_latency <= LATENCY_TARGET
+                and self.success_rate >= SUCCESS_RATE_TARGET
+                and self.throttle_rate <= THROTTLE_RATE_LIMIT
+            ):
+                self._streak = 0
+                self.delay = max(MIN_DELAY, self.delay * 0.8)
+                self.concurrency = min(MAX_CONCURRENCY, self.concurrency + 1)
+                self.pause_minutes = max(MIN_PAUSE_MINUTES, self.pause_minutes - 1)
+                logger.info(
+                    f'Throttle {self.host}: speed up, delay={self.delay:.1f}s, '
+                    f'concurrency={self.concurrency}, pause={self.pause_minutes}m'
+                )
+
+    def record_error(self):
+        with self._cond:
+            self.dirty = True
+            self.requests_total += 1
+            self.window.append(None)
+            self._back_off(1.25)
+            if len(self.window) >= MIN_WINDOW and self.success_rate < SUCCESS_RATE_TARGET:
+                logger.warning(
+                    f'Throttle {self.host}: success rate {self.success_rate:.0%}, '
+                    f'delay={self.delay:.1f}s'
+                )
+
+    def save(self):
+        """
+        Сохраняет состояние в HostThrottle через update_or_create:
+        запись нового хоста мог уже создать параллельный запуск.
+        """
+        with self._cond:
+            defaults = {
+                'delay_seconds': self.delay,
+                'concurrency': self.concurrency,
+                'pause_minutes': self.pause_minutes,
+                'avg_latency': self.avg_latency,
+                'requests_total': self.requests_total,
+                'throttled_total': self.throttled_total,
+            }
+            self.dirty = False
+        self.record, _ = HostThrottle.objects.update_or_create(
+            host=self.host, defaults=defaults
+        )
+
+
+class HostThrottleRegistry:
+    """
+    Набор регуляторов по хостам. Состояние загружается из HostThrottle
+    при создании и сохраняется методом persist() из основного потока.
+    """
+    def __init__(self):
+        self._controllers = {
+            record.host: HostRateController(record)
+            for record in HostThrottle.objects.all()
+        }
+        self._lock = threading.Lock()
+
+    def for_url(self, url):
+        host = urlsplit(url).hostname or ''
+        with self._lock:
+            if host not in self._controllers:
+                self._controllers[host] = HostRateController(
+                    HostThrottle(host=host)
+                )
+            return self._controllers[host]
+
+    @contextmanager
+    def request(self, url):
+        """
+        Выполняет запрос к url в рамках лимитов его хоста. В блок
+        передаётся функция для передачи кода ответа контроллеру.
+        """
+        controller = self.for_url(url)
+        with controller.slot():
+            started = time.monotonic()
+            try:
+                yield lambda status_code: controller.record_response(
+                    status_code, time.monotonic() - started
+                )
+            except Exception:
+                controller.record_error()
+                raise
+
+    def persist(self):
+        for controller in list(self._controllers.values()):
+            if controller.dirty:
+                controller.save()
+
+    def pause_minutes(self):
+        active = [c for c in self._controllers.values() if c.window]
+        if not active:
+            return DEFAULT_PAUSE_MINUTES
+        return max(c.pause_minutes for c in active)
+
+    def bottleneck(self):
+        """
+        Самый медленный из задействованных хостов — он определяет
+        итоговую скорость импорта.
+        """
+        active = [c for c in self._controllers.values() if c.window]
+        if not active:
+            return None
+        return min(active, key=lambda c: c.rate_per_minute)
+
+
+def update_progress_rate(progress_obj, throttle):
+    """
+    Переносит текущую скорость узкого места в ImportProgress,
+    чтобы она отображалась в статусе импорта.
+    """
+    controller = throttle.bottleneck()
+    if controller is None:
+        return
+    progress_obj.request_rate = round(controller.rate_per_minute, 2)
+    progress_obj.concurrency = controller.concurrency
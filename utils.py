@@ -0,0 +1,284 @@
+import csv
+import logging
+import time
+from collections import namedtuple
+from functools import partial
+
+import requests
+from django.utils import timezone
+
+from DjangoAdCrawler.models import ImageRedirect
+from DjangoAdCrawler.executors import ThreadPoolImportExecutor
+from DjangoAdCrawler.throttling import HostThrottleRegistry
+
+logger = logging.getLogger('import_logger')
+
+# Подстрока конечного адреса, по которой отличаем файл изображения Avito
+IMAGE_HOST_MARKER = 'avito.st/image/'
+
+REQUEST_TIMEOUT = 10
+# Сколько доверять закэшированному отказу: 200 с чужого хоста бывает
+# и временной блокировкой ботов (страница на www.avito.ru)
+REJECTION_TTL = timezone.timedelta(hours=6)
+
+AVITO_HEADERS = {
+    'User-Agent': (
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
+        'AppleWebKit/537.36 (KHTML, like Gecko) '
+        'Chrome/122.0.0.0 Safari/537.36'
+    ),
+    'Accept': (
+        'text/html,application/xhtml+xml,application/xml;q=0.9,'
+        'image/webp,*/*;q=0.8'
+    ),
+    'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Referer': 'https://www.avito.ru/',
+    'Cookie': (
+        '__ai_fp_uuid=2f37c7c10901ab6a%3A1; '
+        '__upin=TGhfBOJEiPX8/2CZ2k1wmw; '
+        '_buzz_aidata=JTdCJTIydWZwJTIyJTNBJTIyVEdoZkJPSkVpUFg4JTJGMkNaMmsxd213JTIyJTJDJTIyYnJvd3NlclZlcnNpb24lMjIlM0ElMjIyNS42JTIyJTJDJTIydHNDcmVhdGVkJTIyJTNBMTc1MTgxMDE0MTAwMSU3RA==; '
+        '_buzz_mtsa=JTdCJTIydWZwJTIyJTNBJTIyYjljZTNhZGZjYTZiN2YyYzg4NjNmYzRkZmE4ZGVjNTYlMjIlMkMlMjJicm93c2VyVmVyc2lvbiUyMiUzQSUyMjI1LjYlMjIlMkMlMjJ0c0NyZWF0ZWQlMjIlM0ExNzUxODEwMTQxMTM0JTdE; '
+        '_ga=GA1.1.1215029419.1751810141; '
+        '_ga_M29JC28873=GS2.1.s1751810140$o1$g0$t1751810140$j60$l0$h0; '
+        '_gcl_au=1.1.1460471293.1751810140; '
+        '_ym_d=1751810141; _ym_isad=2; _ym_uid=1751810141202569353; '
+        '_ym_visorc=b; sx=2; abp=0'
+    )
+}
+
+# Коды ответа на HEAD, при которых повторяем запрос через GET без тела
+HEAD_FALLBACK_STATUSES = (403, 405, 501)
+
+ResolvedImage = namedtuple(
+    'ResolvedImage', ['source_url', 'final_url', 'status_code']
+)
+ImageFetchResult = namedtuple(
+    'ImageFetchResult', ['status_code', 'final_url', 'content', 'downloaded']
+)
+
+
+def read_csv_rows(path):
+    """
+    Читает CSV Avito (разделитель ';'), пробуя utf-8, затем cp1251.
+    :return: (список строк, использованная кодировка)
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            return list(csv.reader(f, delimiter=';')), 'utf-8'
+    except UnicodeDecodeError:
+        with open(path, encoding='cp1251') as f:
+            return list(csv.reader(f, delimiter=';')), 'cp1251'
+
+
+def split_image_urls(images_raw):
+    """
+    Разбивает ячейку со ссылками на изображения на список адресов.
+    """
+    if not images_raw:
+        return []
+    for sep in ['|', ';', ',']:
+        if sep in images_raw:
+            return [
+                img_url.strip() for img_url in images_raw.split(sep)
+                if img_url.strip()
+            ]
+    return [images_raw.strip()] if images_raw.strip() else []
+
+
+def is_image_response(final_url, status_code, content_type):
+    """
+    Проверяет, что ответ указывает на файл изображения Avito.
+    Пустой Content-Type допускается — его отдают не все узлы.
+    """
+    if status_code != 200 or IMAGE_HOST_MARKER not in (final_url or ''):
+        return False
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    return not content_type or content_type.startswith('image/')
+
+
+class ImageRedirectResolver:
+    """
+    Стадия разрешения редиректов перед скачиванием изображений.
+    Конечный адрес узнаётся HEAD-запросом (или GET без чтения тела),
+    неподходящие цели отбрасываются до передачи файла. Найденные
+    изображения кэшируются в памяти и в ImageRedirect, поэтому
+    переиспользуются между строками и повторными импортами; отказы
+    хранятся только в ImageRedirect и устаревают через REJECTION_TTL. Все запросы идут через
+    адаптивный регулятор скорости по хостам.
+    """
+    def __init__(self, headers=None, timeout=REQUEST_TIMEOUT, throttle=None):
+        self.headers = headers or AVITO_HEADERS
+        self.timeout = timeout
+        self.throttle = throttle or HostThrottleRegistry()
+        self._cache = {}
+
+    def _remember(self, resolved, persist=True):
+        if resolved.final_url:
+            self._cache[resolved.source_url] = resolved
+        if persist:
+            ImageRedirect.objects.update_or_create(
+                source_url=resolved.source_url,
+                defaults={
+                    'final_url': resolved.final_url or '',
+                    'is_image': bool(resolved.final_url),
+                    'status_code': resolved.status_code,
+                },
+            )
+        return resolved
+
+    def _request(self, method, url, since=None, **kwargs):
+        """
+        Запрос в рамках лимитов хоста. Возвращает None без обращения
+        к сети, если хост ответил 429 после момента since.
+        """
+        with self.throttle.request(url) as record:
+            if since is not None and self.throttle.for_url(url).throttled_since(since):
+                return None
+            resp = requests.request(
+                method, url, timeout=self.timeout, headers=self.headers,
+                **kwargs
+            )
+            record(resp.status_code)
+        return resp
+
+    def _request_target(self, url):
+        resp = self._request('HEAD', url, allow_redirects=True)
+        if resp.status_code in HEAD_FALLBACK_STATUSES:
+            resp = self._request('GET', url, allow_redirects=True, stream=True)
+            resp.close()
+        return resp
+
+    @staticmethod
+    def _from_record(record):
+        """
+        ResolvedImage из записи кэша или None, если запись не окончательна:
+        отказ с кодом, отличным от 200, или отказ старше REJECTION_TTL
+        мог быть временной блокировкой.
+        """
+        if not record.is_image and (
+            record.status_code != 200
+            or record.resolved_at < timezone.now() - REJECTION_TTL
+        ):
+            return None
+        return ResolvedImage(
+            record.source_url,
+            record.final_url if record.is_image else None,
+            record.status_code,
+        )
+
+    def resolve(self, url):
+        """
+        Возвращает ResolvedImage; final_url пустой, если цель отклонена.
+        Кэшируются только окончательные ответы: изображение или 200
+        с неподходящим хостом/Content-Type (на REJECTION_TTL). Коды 4xx
+        (403 при блокировке ботов, 404 и т.п.), 429, 5xx и сетевые ошибки
+        не кэшируются.
+        """
+        if url in self._cache:
+            return self._cache[url]
+        record = ImageRedirect.objects.filter(source_url=url).first()
+        cached = record and self._from_record(record)
+        if cached:
+            return self._remember(cached, persist=False)
+        try:
+            resp = self._request_target(url)
+        except requests.RequestException as e:
+            logger.error(f'Error resolving image {url}: {e}')
+            return ResolvedImage(url, None, 0)
+        final_url = resp.url
+        logger.info(
+            f'Resolve image: {url} -> {final_url}, status={resp.status_code}'
+        )
+        if resp.status_code != 200:
+            return ResolvedImage(url, None, resp.status_code)
+        if is_image_response(
+            final_url, resp.status_code, resp.headers.get('Content-Type')
+        ):
+            return self._remember(ResolvedImage(url, final_url, resp.status_code))
+        logger.warning(f'Rejected image target {url} -> {final_url}')
+        return self._remember(ResolvedImage(url, None, resp.status_code))
+
+    def prefetch(self, urls):
+        """
+        Разрешает редиректы для списка ссылок заранее, одним запросом
+        подтягивая уже известные адреса из базы. Останавливается на 429.
+        """
+        pending = [url for url in urls if url not in self._cache]
+        if pending:
+            for record in ImageRedirect.objects.filter(source_url__in=pending):
+                cached = self._from_record(record)
+                if cached and cached.final_url:
+                    self._cache[record.source_url] = cached
+        resolved = {}
+        for url in urls:
+            resolved[url] = self.resolve(url)
+            if resolved[url].status_code == 429:
+                break
+        return resolved
+
+    def invalidate(self, url):
+        self._cache.pop(url, None)
+        ImageRedirect.objects.filter(source_url=url).delete()
+
+    def _download(self, resolved, since=None):
+        """
+        Скачивает изображение по уже разрешённому адресу без повторного
+        редиректа. Отклонённые цели возвращаются без сетевого запроса тела.
+        К базе не обращается, поэтому безопасен для рабочих потоков.
+        """
+        url = resolved.source_url
+        if not resolved.final_url:
+            return ImageFetchResult(resolved.status_code, None, None, False)
+        resp = self._request(
+            'GET', resolved.final_url, since=since, allow_redirects=False
+        )
+        if resp is None:
+            return ImageFetchResult(429, resolved.final_url, None, False)
+        logger.info(
+            f'Download image: {url} -> {resolved.final_url}, '
+            f'status={resp.status_code}'
+        )
+        if is_image_response(
+            resolved.final_url, resp.status_code,
+            resp.headers.get('Content-Type')
+        ):
+            return ImageFetchResult(
+                resp.status_code, resolved.final_url, resp.content, True
+            )
+        return ImageFetchResult(resp.status_code, resolved.final_url, None, True)
+
+    def _download_safe(self, resolved, since=None):
+        try:
+            return self._download(resolved, since=since)
+        except requests.RequestException as e:
+            logger.error(f'Error downloading image {resolved.source_url}: {e}')
+            return ImageFetchResult(0, resolved.final_url, None, True)
+
+    def _drop_stale(self, url, fetched):
+        # Закэшированный адрес устарел — разрешим заново в следующий раз
+        if (
+            fetched.downloaded and fetched.content is None
+            and 0 < fetched.status_code < 500 and fetched.status_code != 429
+        ):
+            self.invalidate(url)
+
+    def fetch_many(self, urls, executor=None):
+        """
+        Разрешает ссылки заранее и скачивает изображения параллельно
+        через executor.map, в пределах лимитов регулятора. Порядок
+        результатов совпадает с порядком urls. После 429 при разрешении
+        оставшиеся ссылки не разрешаются, а после 429 от хоста при
+        скачивании ещё не отправленные запросы к нему не выполняются —
+        для них возвращается результат со статусом 429.
+        """
+        since = time.monotonic()
+        resolved = self.prefetch(urls)
+        pending = [
+            resolved.get(url) or ResolvedImage(url, None, 429) for url in urls
+        ]
+        executor = executor or ThreadPoolImportExecutor()
+        results = executor.map(partial(self._download_safe, since=since), pending)
+        for url, fetched in zip(urls, results):
+            self._drop_stale(url, fetched)
+        return results
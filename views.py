@@ -9,6 +9,8 @@ def DjangoAdCrawler_import_progress_status(request):
         'current': 0,
         'total': 0,
         'error': '',
+        'rate': 0,
+        'concurrency': 0,
     }
     if user:
         progress = ImportProgress.objects.filter(user=user)
@@ -17,6 +19,8 @@ def DjangoAdCrawler_import_progress_status(request):
             data['status'] = progress.status
             data['current'] = progress.last_success_row
             data['total'] = progress.total_rows or 0
+            data['rate'] = progress.request_rate
+            data['concurrency'] = progress.concurrency
             if progress.status == 'error':
-                data['error'] = progress.error or 'Ошибка импорта'
+                data['error'] = progress.last_message or 'Ошибка импорта'
     return JsonResponse(data)